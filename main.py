@@ -1,9 +1,9 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from pathlib import Path
 import unicodedata
 from plotly.subplots import make_subplots
-import plotly.express as px
 import plotly.graph_objects as go
 import io
 
@@ -39,23 +39,95 @@ SCHOOL_INFO = {
     "동산고": {"ec": 8.0, "color": "#d62728"},
 }
 
+# 환경 데이터 수치 컬럼
+ENV_COLUMNS = ["temperature", "humidity", "ph", "ec"]
+
+# 생육 데이터에서 사용하는 컬럼 (개체번호 + 측정값)
+GROWTH_COLUMNS = ["개체번호", "잎 수(장)", "지상부 길이(mm)", "생중량(g)"]
+
+# 시계열 그래프에 전송할 최대 포인트 수
+TS_MAX_POINTS = 2000
+
+# =========================
+# 그래프 상수
+# =========================
+ENV_SUBPLOT_TITLES = ["평균 온도", "평균 습도", "평균 pH", "목표 EC vs 실측 EC"]
+
+ENV_TS_SIGNALS = [("temperature", "온도"), ("humidity", "습도"), ("ec", "EC")]
+
+GROWTH_METRICS = [
+    ("생중량(g)", "평균 생중량"),
+    ("잎 수(장)", "평균 잎 수"),
+    ("지상부 길이(mm)", "평균 지상부 길이"),
+    (None, "개체수")
+]
+
+# 상호작용이 필요 없는 요약 막대그래프용 설정
+STATIC_PLOT_CONFIG = {"staticPlot": True, "displayModeBar": False}
+
 # =========================
 # 유틸 함수
 # =========================
 def nfc(text):
     return unicodedata.normalize("NFC", text)
 
-def find_file_by_keyword(directory: Path, keyword: str):
+@st.cache_data
+def index_directory(directory: Path):
+    return {nfc(file.name): file for file in directory.iterdir()}
+
+def find_file_by_keyword(directory: Path, keyword: str, suffix: str | None = None):
     keyword = nfc(keyword)
-    for file in directory.iterdir():
-        if keyword in nfc(file.name):
-            return file
-    return None
+    index = index_directory(directory)
+    return next(
+        (file for name, file in index.items()
+         if keyword in name and (suffix is None or file.suffix == suffix)),
+        None
+    )
+
+def subplot_axes(idx):
+    """make_subplots 격자에서 idx번째 칸의 축 참조 (x, y, x2, y2, ...)"""
+    suffix = "" if idx == 0 else str(idx + 1)
+    return dict(xaxis=f"x{suffix}", yaxis=f"y{suffix}")
+
+@st.cache_resource
+def subplot_layout(titles):
+    """2x2 make_subplots 뼈대의 layout dict (프로세스당 한 번만 생성)"""
+    return make_subplots(rows=2, cols=2, subplot_titles=list(titles)).to_dict()["layout"]
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets 다운샘플링으로 남길 인덱스 반환"""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i == n_out - 3:
+            avg_x, avg_y = x[-1], y[-1]
+        else:
+            next_end = edges[i + 2]
+            avg_x = x[end:next_end].mean()
+            avg_y = y[end:next_end].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        idx[i + 1] = a
+
+    return idx
 
 # =========================
 # 데이터 로딩
 # =========================
-@st.cache_data
+# 정적 데이터이며 앱에서 수정하지 않으므로 cache_resource로 참조를 공유
+@st.cache_resource
 def load_environment_data():
     env_data = {}
     for school in SCHOOL_INFO.keys():
@@ -64,32 +136,225 @@ def load_environment_data():
             st.error(f"{school} 환경 데이터 파일을 찾을 수 없습니다.")
             continue
 
-        df = pd.read_csv(file)
-        df["time"] = pd.to_datetime(df["time"])
+        df = pd.read_csv(
+            file,
+            engine="pyarrow",
+            usecols=["time"] + ENV_COLUMNS,
+            parse_dates=["time"]
+        )
+        # 사용하는 컬럼만 남기고 float32로 캐시 크기 절감
+        df = df[["time"] + ENV_COLUMNS].astype(dict.fromkeys(ENV_COLUMNS, "float32"))
         env_data[school] = df
 
     return env_data
 
-@st.cache_data
+@st.cache_resource
 def load_growth_data():
-    xlsx_file = None
-    for file in DATA_DIR.iterdir():
-        if "생육결과" in nfc(file.name) and file.suffix == ".xlsx":
-            xlsx_file = file
-            break
+    xlsx_file = find_file_by_keyword(DATA_DIR, "생육결과", ".xlsx")
 
     if xlsx_file is None:
         st.error("생육 결과 XLSX 파일을 찾을 수 없습니다.")
         return {}
 
-    xls = pd.ExcelFile(xlsx_file)
-    growth_data = {}
+    # 모든 시트를 한 번에 파싱
+    growth_data = pd.read_excel(
+        xlsx_file,
+        sheet_name=None,
+        usecols=GROWTH_COLUMNS,
+        engine="openpyxl"
+    )
+
+    return {nfc(sheet): df for sheet, df in growth_data.items()}
+
+# =========================
+# 집계 함수
+# =========================
+# 원본 데이터는 cache_resource로 공유되는 읽기 전용 객체이므로 DataFrame을
+# 인자로 넘기지 않고 함수 안에서 로더를 호출한다. (캐시 적중 시 DataFrame 해싱 생략)
+@st.cache_data
+def build_combined_growth():
+    growth_data = load_growth_data()
+    return pd.concat(
+        [df.assign(학교=school) for school, df in growth_data.items()],
+        ignore_index=True
+    )
+
+@st.cache_data
+def compute_env_averages():
+    env_data = load_environment_data()
+    schools = list(env_data)
+    # 학교별 수치 컬럼을 하나의 배열로 꺼내 한 번의 NumPy reduction으로 평균 계산
+    env_numeric = [
+        env_data[s][ENV_COLUMNS].to_numpy(dtype=np.float32, copy=False)
+        for s in schools
+    ]
+    sums = np.stack([np.nansum(arr, axis=0, dtype=np.float64) for arr in env_numeric])
+    counts = np.stack([np.count_nonzero(~np.isnan(arr), axis=0) for arr in env_numeric])
+    # 전부 결측인 컬럼은 pandas .mean()과 같이 NaN
+    means = np.divide(sums, counts, out=np.full(sums.shape, np.nan), where=counts > 0)
+
+    avg_df = pd.DataFrame(means, columns=["온도", "습도", "pH", "EC"])
+    avg_df.insert(0, "학교", schools)
+
+    # 전체 평균 = 전체 합 / 전체 측정 개수 (결측치 제외, 전부 결측인 학교도 안전)
+    overall = sums.sum(axis=0) / counts.sum(axis=0)
+    avg_temp, avg_hum = overall[0], overall[1]
+
+    return avg_df, avg_temp, avg_hum
+
+@st.cache_data
+def compute_growth_summary():
+    growth_data = load_growth_data()
+    growth_summary_df = (
+        build_combined_growth()
+        .groupby("학교", sort=False)
+        .agg(**{
+            "생중량(g)": ("생중량(g)", "mean"),
+            "잎 수(장)": ("잎 수(장)", "mean"),
+            "지상부 길이(mm)": ("지상부 길이(mm)", "mean"),
+            "개체수": ("생중량(g)", "size"),
+        })
+        .reindex(list(growth_data))
+        .reset_index()
+    )
+    return growth_summary_df
+
+@st.cache_data
+def downsample(school, column, n_out=TS_MAX_POINTS):
+    df = load_environment_data()[school]
+    sub = df[["time", column]].dropna()
+    x = sub["time"].astype("int64").to_numpy(dtype=np.float64)
+    y = sub[column].to_numpy(dtype=np.float64)
+    return sub.iloc[lttb_indices(x, y, n_out)]
+
+@st.cache_data
+def build_env_csv(school):
+    df = load_environment_data()[school]
+    return df.to_csv(index=False).encode("utf-8-sig")
+
+@st.cache_data
+def build_growth_xlsx():
+    growth_data = load_growth_data()
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        for school, df in growth_data.items():
+            df.to_excel(writer, sheet_name=school, index=False)
+    return buffer.getvalue()
+
+# =========================
+# 그래프 생성 함수
+# =========================
+# 그래프는 dict로 캐시하고, 데이터가 바뀔 때만 다시 생성한다.
+@st.cache_data
+def build_env_subplot_fig():
+    avg_df, _, _ = compute_env_averages()
+    schools = avg_df["학교"].tolist()
+    marker = dict(color=[SCHOOL_INFO[s]["color"] for s in schools])
+    # 학교별 색상 막대는 범례 색이 첫 학교 색으로만 표시되므로 범례에서 제외
+    # (학교는 x축으로 구분, 범례는 회색 목표 EC만 표시)
+    traces = [
+        dict(type="bar", x=schools, y=avg_df["온도"].tolist(),
+             name="평균 온도", marker=marker, showlegend=False, **subplot_axes(0)),
+        dict(type="bar", x=schools, y=avg_df["습도"].tolist(),
+             name="평균 습도", marker=marker, showlegend=False, **subplot_axes(1)),
+        dict(type="bar", x=schools, y=avg_df["pH"].tolist(),
+             name="평균 pH", marker=marker, showlegend=False, **subplot_axes(2)),
+        dict(type="bar", x=schools, y=[SCHOOL_INFO[s]["ec"] for s in schools],
+             name="목표 EC", marker=dict(color="#b0b0b0"), **subplot_axes(3)),
+        dict(type="bar", x=schools, y=avg_df["EC"].tolist(),
+             name="실측 EC", marker=marker, showlegend=False, **subplot_axes(3)),
+    ]
+
+    fig = go.Figure(data=traces, layout=subplot_layout(tuple(ENV_SUBPLOT_TITLES)))
+    fig.update_layout(height=700, font=PLOTLY_FONT, showlegend=True)
+    return fig.to_dict()
 
-    for sheet in xls.sheet_names:
-        df = pd.read_excel(xlsx_file, sheet_name=sheet)
-        growth_data[sheet] = df
+@st.cache_data
+def build_timeseries_fig(school):
+    traces = []
+    for col_name, label in ENV_TS_SIGNALS:
+        ds = downsample(school, col_name)
+        traces.append(dict(type="scattergl", x=ds["time"], y=ds[col_name], name=label))
+
+    fig_ts = go.Figure(data=traces)
+    fig_ts.add_hline(
+        y=SCHOOL_INFO[school]["ec"],
+        line_dash="dot",
+        annotation_text="목표 EC"
+    )
 
-    return growth_data
+    fig_ts.update_layout(
+        title=f"{school} 환경 변화",
+        font=PLOTLY_FONT
+    )
+    return fig_ts.to_dict()
+
+@st.cache_data
+def build_growth_summary_fig():
+    growth_summary_df = compute_growth_summary()
+    growth_by_school = growth_summary_df.set_index("학교").reindex(list(SCHOOL_INFO))
+
+    # 트레이스를 dict로 만들어 한 번에 Figure 생성
+    traces = [
+        dict(
+            type="bar",
+            x=list(SCHOOL_INFO.keys()),
+            y=growth_by_school[col_name or "개체수"].tolist(),
+            name=title,
+            marker=dict(color=[info["color"] for info in SCHOOL_INFO.values()]),
+            **subplot_axes(idx)
+        )
+        for idx, (col_name, title) in enumerate(GROWTH_METRICS)
+    ]
+
+    fig = go.Figure(data=traces, layout=subplot_layout(tuple(m[1] for m in GROWTH_METRICS)))
+    # 학교는 x축과 막대 색으로 구분하므로 범례는 표시하지 않음
+    fig.update_layout(height=700, font=PLOTLY_FONT, showlegend=False)
+    return fig.to_dict()
+
+@st.cache_data
+def build_growth_box_fig():
+    box_df = build_combined_growth()
+    # 학교별로 트레이스를 나누지 않고 long-form 단일 박스 트레이스로 구성
+    trace = dict(
+        type="box",
+        x=box_df["학교"],
+        y=box_df["생중량(g)"],
+        boxpoints="outliers",
+        name="생중량(g)"
+    )
+    layout = dict(
+        xaxis=dict(title=dict(text="학교")),
+        yaxis=dict(title=dict(text="생중량(g)")),
+        font=PLOTLY_FONT
+    )
+
+    fig_box = go.Figure(data=[trace], layout=layout)
+    return fig_box.to_dict()
+
+@st.cache_data
+def build_correlation_fig(x_col):
+    box_df = build_combined_growth()
+    traces = [
+        dict(
+            type="scattergl",
+            mode="markers",
+            x=df[x_col],
+            y=df["생중량(g)"],
+            name=school,
+            marker=dict(color=SCHOOL_INFO.get(school, {}).get("color"))
+        )
+        for school, df in box_df.groupby("학교", sort=False)
+    ]
+    layout = dict(
+        xaxis=dict(title=dict(text=x_col)),
+        yaxis=dict(title=dict(text="생중량(g)")),
+        legend=dict(title=dict(text="학교")),
+        font=PLOTLY_FONT
+    )
+
+    fig = go.Figure(data=traces, layout=layout)
+    return fig.to_dict()
 
 # =========================
 # 데이터 로딩 실행
@@ -101,6 +366,9 @@ with st.spinner("데이터 로딩 중..."):
 if not env_data or not growth_data:
     st.stop()
 
+_, avg_temp, avg_hum = compute_env_averages()
+growth_summary_df = compute_growth_summary()
+
 # =========================
 # 사이드바
 # =========================
@@ -115,34 +383,41 @@ school_option = st.sidebar.selectbox(
 # =========================
 st.title("🌱 극지식물 최적 EC 농도 연구")
 
-tab1, tab2, tab3 = st.tabs(["📖 실험 개요", "🌡️ 환경 데이터", "📊 생육 결과"])
+# 선택된 화면만 렌더링 (st.tabs는 모든 탭 본문을 매번 실행함)
+VIEWS = ["📖 실험 개요", "🌡️ 환경 데이터", "📊 생육 결과"]
+view = st.radio(
+    "화면 선택",
+    VIEWS,
+    horizontal=True,
+    key="view",
+    label_visibility="collapsed"
+)
 
 # =========================
 # Tab 1: 실험 개요
 # =========================
-with tab1:
+def render_overview_tab(growth_summary_df, avg_temp, avg_hum):
     st.subheader("연구 배경 및 목적")
     st.markdown("""
 본 연구는 **EC(전기전도도)** 농도 차이가 극지식물의 생육에 미치는 영향을 분석하여  
 최적의 EC 조건을 도출하는 것을 목표로 한다.
 """)
 
-    table_data = []
-    total_count = 0
-
-    for school, info in SCHOOL_INFO.items():
-        count = len(growth_data.get(school, []))
-        total_count += count
-        table_data.append([school, info["ec"], count, info["color"]])
-
-    summary_df = pd.DataFrame(
-        table_data,
-        columns=["학교", "EC 목표", "개체수", "색상"]
+    counts = dict(zip(growth_summary_df["학교"], growth_summary_df["개체수"]))
+    total_count = int(growth_summary_df["개체수"].sum())
+
+    schools = list(SCHOOL_INFO)
+    n = len(schools)
+    summary_df = pd.DataFrame({
+        "학교": schools,
+        "EC 목표": np.fromiter((SCHOOL_INFO[s]["ec"] for s in schools), np.float32, count=n),
+        "개체수": np.fromiter((counts.get(s, 0) for s in schools), np.int32, count=n),
+        "색상": [SCHOOL_INFO[s]["color"] for s in schools],
+    })
+    st.dataframe(
+        summary_df.convert_dtypes(dtype_backend="pyarrow"),
+        use_container_width=True
     )
-    st.dataframe(summary_df, use_container_width=True)
-
-    avg_temp = pd.concat(env_data.values())["temperature"].mean()
-    avg_hum = pd.concat(env_data.values())["humidity"].mean()
 
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("총 개체수", total_count)
@@ -153,92 +428,45 @@ with tab1:
 # =========================
 # Tab 2: 환경 데이터
 # =========================
-with tab2:
+def render_env_tab(env_data, school_option):
     st.subheader("학교별 환경 평균 비교")
 
-    avg_env = []
-    for school, df in env_data.items():
-        avg_env.append([
-            school,
-            df["temperature"].mean(),
-            df["humidity"].mean(),
-            df["ph"].mean(),
-            df["ec"].mean()
-        ])
-
-    avg_df = pd.DataFrame(
-        avg_env,
-        columns=["학교", "온도", "습도", "pH", "EC"]
+    fig = go.Figure(build_env_subplot_fig())
+    st.plotly_chart(
+        fig,
+        use_container_width=True,
+        theme=None,
+        key="env_subplot",
+        config=STATIC_PLOT_CONFIG
     )
 
-    fig = make_subplots(
-        rows=2, cols=2,
-        subplot_titles=["평균 온도", "평균 습도", "평균 pH", "목표 EC vs 실측 EC"]
-    )
-
-    fig.add_trace(go.Bar(x=avg_df["학교"], y=avg_df["온도"]), 1, 1)
-    fig.add_trace(go.Bar(x=avg_df["학교"], y=avg_df["습도"]), 1, 2)
-    fig.add_trace(go.Bar(x=avg_df["학교"], y=avg_df["pH"]), 2, 1)
-
-    fig.add_trace(go.Bar(
-        x=avg_df["학교"],
-        y=[SCHOOL_INFO[s]["ec"] for s in avg_df["학교"]],
-        name="목표 EC"
-    ), 2, 2)
-    fig.add_trace(go.Bar(
-        x=avg_df["학교"],
-        y=avg_df["EC"],
-        name="실측 EC"
-    ), 2, 2)
-
-    fig.update_layout(height=700, font=PLOTLY_FONT, showlegend=True)
-    st.plotly_chart(fig, use_container_width=True)
-
     st.subheader("학교별 시계열 데이터")
     target_schools = env_data.keys() if school_option == "전체" else [school_option]
 
     for school in target_schools:
         df = env_data[school]
 
-        fig_ts = go.Figure()
-        fig_ts.add_trace(go.Scatter(x=df["time"], y=df["temperature"], name="온도"))
-        fig_ts.add_trace(go.Scatter(x=df["time"], y=df["humidity"], name="습도"))
-        fig_ts.add_trace(go.Scatter(x=df["time"], y=df["ec"], name="EC"))
-        fig_ts.add_hline(
-            y=SCHOOL_INFO[school]["ec"],
-            line_dash="dot",
-            annotation_text="목표 EC"
-        )
-
-        fig_ts.update_layout(
-            title=f"{school} 환경 변화",
-            font=PLOTLY_FONT
-        )
-        st.plotly_chart(fig_ts, use_container_width=True)
+        fig_ts = go.Figure(build_timeseries_fig(school))
+        st.plotly_chart(fig_ts, use_container_width=True, theme=None, key=f"env_ts_{school}")
 
         with st.expander(f"{school} 환경 데이터 원본"):
             st.dataframe(df)
-            buffer = io.BytesIO()
-            df.to_excel(buffer, index=False, engine="openpyxl")
-            buffer.seek(0)
             st.download_button(
                 "CSV 다운로드",
-                data=buffer,
-                file_name=f"{school}_환경데이터.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                data=build_env_csv(school),
+                file_name=f"{school}_환경데이터.csv",
+                mime="text/csv"
             )
 
 # =========================
 # Tab 3: 생육 결과
 # =========================
-with tab3:
+def render_growth_tab(growth_summary_df):
     st.subheader("EC별 평균 생중량")
 
-    result = []
-    for school, df in growth_data.items():
-        result.append([school, df["생중량(g)"].mean()])
-
-    res_df = pd.DataFrame(result, columns=["학교", "평균 생중량"])
+    res_df = growth_summary_df[["학교", "생중량(g)"]].rename(
+        columns={"생중량(g)": "평균 생중량"}
+    )
     best_school = res_df.loc[res_df["평균 생중량"].idxmax(), "학교"]
 
     col = st.columns(len(res_df))
@@ -248,57 +476,40 @@ with tab3:
         else:
             col[i].metric(row["학교"], f"{row['평균 생중량']:.2f} g")
 
-    metrics = [
-        ("생중량(g)", "평균 생중량"),
-        ("잎 수(장)", "평균 잎 수"),
-        ("지상부 길이(mm)", "평균 지상부 길이"),
-        (None, "개체수")
-    ]
-
-    fig = make_subplots(rows=2, cols=2, subplot_titles=[m[1] for m in metrics])
-
-    for idx, (col_name, _) in enumerate(metrics):
-        r, c = divmod(idx, 2)
-        if col_name:
-            y = [growth_data[s][col_name].mean() for s in SCHOOL_INFO]
-        else:
-            y = [len(growth_data[s]) for s in SCHOOL_INFO]
-
-        fig.add_trace(go.Bar(
-            x=list(SCHOOL_INFO.keys()),
-            y=y
-        ), r + 1, c + 1)
-
-    fig.update_layout(height=700, font=PLOTLY_FONT)
-    st.plotly_chart(fig, use_container_width=True)
+    fig = go.Figure(build_growth_summary_fig())
+    st.plotly_chart(
+        fig,
+        use_container_width=True,
+        theme=None,
+        key="growth_summary",
+        config=STATIC_PLOT_CONFIG
+    )
 
     st.subheader("학교별 생중량 분포")
-    box_df = pd.concat([
-        df.assign(학교=school) for school, df in growth_data.items()
-    ])
-    fig_box = px.box(box_df, x="학교", y="생중량(g)")
-    fig_box.update_layout(font=PLOTLY_FONT)
-    st.plotly_chart(fig_box, use_container_width=True)
+    fig_box = go.Figure(build_growth_box_fig())
+    st.plotly_chart(fig_box, use_container_width=True, theme=None, key="growth_box")
 
     st.subheader("상관관계 분석")
-    fig1 = px.scatter(box_df, x="잎 수(장)", y="생중량(g)", color="학교")
-    fig1.update_layout(font=PLOTLY_FONT)
-    st.plotly_chart(fig1, use_container_width=True)
+    fig1 = go.Figure(build_correlation_fig("잎 수(장)"))
+    st.plotly_chart(fig1, use_container_width=True, theme=None, key="corr_leaf")
 
-    fig2 = px.scatter(box_df, x="지상부 길이(mm)", y="생중량(g)", color="학교")
-    fig2.update_layout(font=PLOTLY_FONT)
-    st.plotly_chart(fig2, use_container_width=True)
+    fig2 = go.Figure(build_correlation_fig("지상부 길이(mm)"))
+    st.plotly_chart(fig2, use_container_width=True, theme=None, key="corr_length")
 
     with st.expander("생육 데이터 원본 다운로드"):
-        buffer = io.BytesIO()
-        with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
-            for school, df in growth_data.items():
-                df.to_excel(writer, sheet_name=school, index=False)
-        buffer.seek(0)
-
         st.download_button(
             "XLSX 다운로드",
-            data=buffer,
+            data=build_growth_xlsx(),
             file_name="학교별_생육결과.xlsx",
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         )
+
+# =========================
+# 화면 렌더링
+# =========================
+if view == VIEWS[0]:
+    render_overview_tab(growth_summary_df, avg_temp, avg_hum)
+elif view == VIEWS[1]:
+    render_env_tab(env_data, school_option)
+else:
+    render_growth_tab(growth_summary_df)